@@ -4,42 +4,91 @@ Load environment variables from .env file if present.
 """
 
 import os
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Gmail API settings
-GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
-CREDENTIALS_FILE = os.getenv('CREDENTIALS_FILE', 'credentials.json')
-TOKEN_FILE = os.getenv('TOKEN_FILE', 'token.json')
+@dataclass(frozen=True)
+class _Config:
+    """Application settings, read from the environment once at import."""
+    
+    # Gmail API settings
+    GMAIL_SCOPES: tuple
+    CREDENTIALS_FILE: str
+    TOKEN_FILE: str
+    
+    # Email processing settings
+    MAX_EMAILS: int
+    BODY_PREVIEW_LENGTH: int
+    SNIPPET_MIN_LENGTH: int
+    LABEL_NAME: str
+    BATCH_SIZE: int
+    MAX_WORKERS: int
+    ALLOWED_SENDERS: tuple
+    
+    # Ollama API settings
+    OLLAMA_API_URL: str
+    OLLAMA_MODEL: str
+    OLLAMA_TIMEOUT: int
+    OLLAMA_KEEP_ALIVE: str
+    OLLAMA_CONCURRENCY: int
+    
+    # API call retry settings
+    RETRY_ATTEMPTS: int
+    RETRY_DELAY: int
+    
+    # Results settings
+    RESULTS_DIR: str
+    RESULTS_PRETTY: bool
+    CACHE_FILE: str
+    LABEL_CACHE_FILE: str
+    
+    # Logging settings
+    LOG_LEVEL: str
+    LOG_FILE: str
 
-# Email processing settings
-MAX_EMAILS = int(os.getenv('MAX_EMAILS', 100))
-BODY_PREVIEW_LENGTH = int(os.getenv('BODY_PREVIEW_LENGTH', 1000))
-LABEL_NAME = os.getenv('LABEL_NAME', 'potential-unnecessary')
+def _load():
+    """
+    Read all settings from the environment.
+    
+    Returns:
+        _Config: Frozen configuration object
+    """
+    return _Config(
+        GMAIL_SCOPES=('https://www.googleapis.com/auth/gmail.modify',),
+        CREDENTIALS_FILE=os.getenv('CREDENTIALS_FILE', 'credentials.json'),
+        TOKEN_FILE=os.getenv('TOKEN_FILE', 'token.json'),
+        MAX_EMAILS=int(os.getenv('MAX_EMAILS', 100)),
+        BODY_PREVIEW_LENGTH=int(os.getenv('BODY_PREVIEW_LENGTH', 1000)),
+        SNIPPET_MIN_LENGTH=int(os.getenv('SNIPPET_MIN_LENGTH', 150)),
+        LABEL_NAME=os.getenv('LABEL_NAME', 'potential-unnecessary'),
+        BATCH_SIZE=int(os.getenv('BATCH_SIZE', 10)),
+        MAX_WORKERS=int(os.getenv('MAX_WORKERS', 8)),
+        ALLOWED_SENDERS=tuple(sender for sender in os.getenv('ALLOWED_SENDERS', '').split(',') if sender.strip()),
+        OLLAMA_API_URL=os.getenv('OLLAMA_API_URL', 'http://localhost:11434/api'),
+        OLLAMA_MODEL=os.getenv('OLLAMA_MODEL', 'llama3.2:latest'),
+        OLLAMA_TIMEOUT=int(os.getenv('OLLAMA_TIMEOUT', 30)),
+        OLLAMA_KEEP_ALIVE=os.getenv('OLLAMA_KEEP_ALIVE', '10m'),
+        OLLAMA_CONCURRENCY=int(os.getenv('OLLAMA_CONCURRENCY', 4)),
+        RETRY_ATTEMPTS=int(os.getenv('RETRY_ATTEMPTS', 3)),
+        RETRY_DELAY=int(os.getenv('RETRY_DELAY', 2)),
+        RESULTS_DIR=os.getenv('RESULTS_DIR', 'results'),
+        RESULTS_PRETTY=os.getenv('RESULTS_PRETTY', 'false').strip().lower() in ('1', 'true', 'yes'),
+        CACHE_FILE=os.getenv('CACHE_FILE', 'results/cache.db'),
+        LABEL_CACHE_FILE=os.getenv('LABEL_CACHE_FILE', 'results/label_ids.json'),
+        LOG_LEVEL=os.getenv('LOG_LEVEL', 'INFO'),
+        LOG_FILE=os.getenv('LOG_FILE', 'logs/gmail_filter.log')
+    )
 
-# Ollama API settings
-OLLAMA_API_URL = os.getenv('OLLAMA_API_URL', 'http://localhost:11434/api')
-OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2:latest')
-OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', 30))
-
-# API call retry settings
-RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', 3))
-RETRY_DELAY = int(os.getenv('RETRY_DELAY', 2))
-
-# Results settings
-RESULTS_DIR = os.getenv('RESULTS_DIR', 'results')
-
-# Logging settings
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-LOG_FILE = os.getenv('LOG_FILE', 'logs/gmail_filter.log')
+CONFIG = _load()
 
 # Message for validating Ollama
 def check_ollama_settings():
     """Validate Ollama settings."""
-    if not OLLAMA_API_URL:
+    if not CONFIG.OLLAMA_API_URL:
         return "ERROR: Ollama API URL not set. Please check your .env file."
-    if not OLLAMA_MODEL:
+    if not CONFIG.OLLAMA_MODEL:
         return "ERROR: Ollama model not set. Please check your .env file."
-    return None
\ No newline at end of file
+    return None
@@ -6,15 +6,13 @@ and moves unnecessary emails to a separate label.
 
 Usage:
     python main.py
+    gmail-filter        (after pip install -e .)
 """
 
 import os
-import sys
+import sqlite3
 import time
 
-# Add parent directory to path to allow imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 # Import configuration
 import config
 
@@ -22,19 +20,14 @@ import config
 from utils.logging_utils import setup_logging
 from utils.file_utils import ensure_directory_exists, save_results
 
-# Import modules
-from modules.gmail.auth import authenticate_gmail
-from modules.gmail.email_ops import get_emails, get_email_content, move_to_label
-from modules.gmail.label_ops import ensure_label_exists
-from modules.llm.ollama import OllamaClient
-from modules.llm.analyzer import EmailAnalyzer
-
 from loguru import logger
 
 def main():
     """Main function to run the email filter process."""
+    cfg = config.CONFIG
+    
     # Step 1: Setup logging
-    setup_logging(config.LOG_LEVEL, config.LOG_FILE)
+    setup_logging(cfg.LOG_LEVEL, cfg.LOG_FILE)
     
     logger.info("=== Gmail Unnecessary Email Filter ===")
     
@@ -42,8 +35,8 @@ def main():
     logger.info("Step 1: Checking configuration")
     
     # Check if credentials file exists
-    if not os.path.exists(config.CREDENTIALS_FILE):
-        logger.error(f"Credentials file not found: {config.CREDENTIALS_FILE}")
+    if not os.path.exists(cfg.CREDENTIALS_FILE):
+        logger.error(f"Credentials file not found: {cfg.CREDENTIALS_FILE}")
         logger.error("\nTo create credentials.json, follow these steps:")
         logger.error("1. Create a Google Cloud Project at https://console.cloud.google.com/")
         logger.error("2. Enable Gmail API for your project")
@@ -52,8 +45,8 @@ def main():
         return
     
     # Ensure results directory exists
-    if config.RESULTS_DIR:
-        ensure_directory_exists(config.RESULTS_DIR)
+    if cfg.RESULTS_DIR:
+        ensure_directory_exists(cfg.RESULTS_DIR)
     
     # Check Ollama settings
     ollama_message = config.check_ollama_settings()
@@ -61,37 +54,49 @@ def main():
         logger.error(ollama_message)
         return
     
+    # Import modules only once the configuration checks have passed, so a
+    # misconfigured run exits without loading the Google API client
+    from modules.gmail.auth import authenticate_gmail
+    from modules.gmail.email_ops import get_emails, get_email_contents, move_many_to_label
+    from modules.gmail.label_ops import ensure_label_exists
+    from modules.llm.ollama import OllamaClient
+    from modules.llm.analyzer import EmailAnalyzer
+    from modules.cache import ResultCache
+    
     # Step 3: Initialize Ollama client
     logger.info("Step 2: Initializing Ollama client")
     ollama_client = OllamaClient(
-        api_url=config.OLLAMA_API_URL,
-        model=config.OLLAMA_MODEL,
-        timeout=config.OLLAMA_TIMEOUT
+        api_url=cfg.OLLAMA_API_URL,
+        model=cfg.OLLAMA_MODEL,
+        timeout=cfg.OLLAMA_TIMEOUT,
+        keep_alive=cfg.OLLAMA_KEEP_ALIVE,
+        concurrency=cfg.OLLAMA_CONCURRENCY
     )
     
     # Check Ollama availability
     logger.info("Checking Ollama API availability")
     if not ollama_client.check_availability():
-        logger.error(f"Cannot connect to Ollama API at {config.OLLAMA_API_URL}.")
+        logger.error(f"Cannot connect to Ollama API at {cfg.OLLAMA_API_URL}.")
         logger.error("Please make sure Ollama is installed and running.")
         logger.error("Install Ollama from https://ollama.ai/")
-        logger.error(f"Make sure the model is pulled: ollama pull {config.OLLAMA_MODEL}")
+        logger.error(f"Make sure the model is pulled: ollama pull {cfg.OLLAMA_MODEL}")
         return
     
     # Step 4: Initialize email analyzer
     logger.info("Step 3: Initializing email analyzer")
     email_analyzer = EmailAnalyzer(
         llm_client=ollama_client,
-        body_preview_length=config.BODY_PREVIEW_LENGTH
+        snippet_min_length=cfg.SNIPPET_MIN_LENGTH,
+        allowed_senders=cfg.ALLOWED_SENDERS
     )
     
     # Step 5: Authenticate with Gmail
     logger.info("Step 4: Connecting to Gmail")
     try:
         gmail_service = authenticate_gmail(
-            scopes=config.GMAIL_SCOPES,
-            credentials_file=config.CREDENTIALS_FILE,
-            token_file=config.TOKEN_FILE
+            scopes=cfg.GMAIL_SCOPES,
+            credentials_file=cfg.CREDENTIALS_FILE,
+            token_file=cfg.TOKEN_FILE
         )
         logger.info("Successfully connected to Gmail!")
     except Exception as e:
@@ -99,14 +104,16 @@ def main():
         return
     
     # Step 6: Ensure label exists
-    label_name = config.LABEL_NAME
+    label_name = cfg.LABEL_NAME
     logger.info(f"Step 5: Ensuring label '{label_name}' exists")
     try:
         label_id = ensure_label_exists(
             service=gmail_service,
             label_name=label_name,
-            retry_attempts=config.RETRY_ATTEMPTS,
-            retry_delay=config.RETRY_DELAY
+            cache_file=cfg.LABEL_CACHE_FILE,
+            account=os.path.abspath(cfg.TOKEN_FILE),
+            retry_attempts=cfg.RETRY_ATTEMPTS,
+            retry_delay=cfg.RETRY_DELAY
         )
         logger.info(f"Label ready with ID: {label_id}")
     except Exception as e:
@@ -114,13 +121,13 @@ def main():
         return
     
     # Step 7: Get emails from inbox
-    logger.info(f"Step 6: Fetching up to {config.MAX_EMAILS} emails from inbox")
+    logger.info(f"Step 6: Fetching up to {cfg.MAX_EMAILS} emails from inbox")
     try:
         emails = get_emails(
             service=gmail_service,
-            max_results=config.MAX_EMAILS,
-            retry_attempts=config.RETRY_ATTEMPTS,
-            retry_delay=config.RETRY_DELAY
+            max_results=cfg.MAX_EMAILS,
+            retry_attempts=cfg.RETRY_ATTEMPTS,
+            retry_delay=cfg.RETRY_DELAY
         )
         logger.info(f"Found {len(emails)} emails to process")
     except Exception as e:
@@ -133,57 +140,132 @@ def main():
     
     emails_processed = []
     unnecessary_emails = []
+    to_move = []
     
-    for i, email_msg in enumerate(emails):
+    # Reuse results from previous runs for emails that were already analyzed
+    cache = None
+    if cfg.CACHE_FILE:
         try:
-            # Get email content
-            email_data = get_email_content(
+            cache = ResultCache(
+                cfg.CACHE_FILE,
+                model=cfg.OLLAMA_MODEL,
+                version=email_analyzer.classifier_version
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache {cfg.CACHE_FILE} unavailable, analyzing all emails: {str(e)}")
+    msg_ids = []
+    for email_msg in emails:
+        cached = cache.get(email_msg['id']) if cache else None
+        if cached is None:
+            msg_ids.append(email_msg['id'])
+            continue
+        
+        emails_processed.append(cached)
+        if not cached['is_necessary']:
+            to_move.append(cached)
+    
+    if emails_processed:
+        logger.info(f"Reusing cached results for {len(emails_processed)} emails")
+    
+    # Fetch headers and snippets of every email first so they can be analyzed in batches
+    email_contents = get_email_contents(
+        service=gmail_service,
+        msg_ids=msg_ids,
+        max_workers=cfg.MAX_WORKERS,
+        retry_attempts=cfg.RETRY_ATTEMPTS,
+        retry_delay=cfg.RETRY_DELAY,
+        fmt='metadata'
+    )
+    
+    # Only download the full body of emails whose snippet is too short to judge
+    needs_body = [
+        email_data.id for email_data in email_contents
+        if email_analyzer.needs_full_content(email_data)
+    ]
+    if needs_body:
+        logger.info(f"Fetching full content for {len(needs_body)} emails with short snippets")
+        full_contents = get_email_contents(
+            service=gmail_service,
+            msg_ids=needs_body,
+            max_workers=cfg.MAX_WORKERS,
+            retry_attempts=cfg.RETRY_ATTEMPTS,
+            retry_delay=cfg.RETRY_DELAY,
+            fmt='full',
+            body_preview_length=cfg.BODY_PREVIEW_LENGTH
+        )
+        full_by_id = {email_data.id: email_data for email_data in full_contents}
+        email_contents = [full_by_id.get(email_data.id, email_data) for email_data in email_contents]
+    
+    # Analyze emails in batches, one LLM call per batch
+    logger.info(f"Analyzing {len(email_contents)} emails in batches of {cfg.BATCH_SIZE}")
+    verdicts = email_analyzer.check_necessity_batch(
+        email_contents,
+        batch_size=cfg.BATCH_SIZE
+    )
+    ollama_client.close()
+    
+    new_results = []
+    
+    for i, (email_data, verdict) in enumerate(zip(email_contents, verdicts)):
+        # Print progress
+        logger.info(f"Processing email {i+1}/{len(email_contents)}: '{email_data.subject[:50]}...'")
+        
+        # Emails without a usable verdict are kept in the inbox
+        is_necessary = verdict is not False
+        
+        # Store processed information
+        result = {
+            'id': email_data.id,
+            'subject': email_data.subject,
+            'sender': email_data.sender,
+            'is_necessary': is_necessary
+        }
+        emails_processed.append(result)
+        if verdict is not None:
+            new_results.append(result)
+        
+        if not is_necessary:
+            logger.info(f"  → Determined to be unnecessary, moving to '{label_name}'")
+            to_move.append(result)
+        else:
+            logger.info(f"  → Determined to be necessary, keeping in inbox")
+    
+    if cache:
+        cache.put_many(new_results)
+        cache.close()
+    
+    # Move all unnecessary emails to our label
+    if to_move:
+        moved_ids = set(move_many_to_label(
+            service=gmail_service,
+            msg_ids=[result['id'] for result in to_move],
+            label_id=label_id,
+            retry_attempts=cfg.RETRY_ATTEMPTS,
+            retry_delay=cfg.RETRY_DELAY,
+            # Looks the label up again if its cached ID turns out to be stale
+            refresh_label=lambda: ensure_label_exists(
                 service=gmail_service,
-                msg_id=email_msg['id'],
-                retry_attempts=config.RETRY_ATTEMPTS,
-                retry_delay=config.RETRY_DELAY
+                label_name=label_name,
+                cache_file=cfg.LABEL_CACHE_FILE,
+                account=os.path.abspath(cfg.TOKEN_FILE),
+                refresh=True,
+                retry_attempts=cfg.RETRY_ATTEMPTS,
+                retry_delay=cfg.RETRY_DELAY
             )
-            
-            # Print progress
-            logger.info(f"Processing email {i+1}/{len(emails)}: '{email_data['subject'][:50]}...'")
-            
-            # Check necessity
-            is_necessary = email_analyzer.check_necessity(email_data)
-            
-            # Store processed information
-            result = {
-                'id': email_msg['id'],
-                'subject': email_data['subject'],
-                'sender': email_data['sender'],
-                'is_necessary': is_necessary
-            }
-            emails_processed.append(result)
-            
-            if not is_necessary:
-                # Move to our label
-                if move_to_label(
-                    service=gmail_service,
-                    msg_id=email_msg['id'],
-                    label_id=label_id,
-                    retry_attempts=config.RETRY_ATTEMPTS,
-                    retry_delay=config.RETRY_DELAY
-                ):
-                    unnecessary_emails.append(result)
-                    logger.info(f"  → Marked as unnecessary and moved to '{label_name}'")
-                else:
-                    logger.warning(f"  → Determined to be unnecessary, but failed to move")
+        ))
+        for result in to_move:
+            if result['id'] in moved_ids:
+                unnecessary_emails.append(result)
             else:
-                logger.info(f"  → Determined to be necessary, keeping in inbox")
-                
-        except Exception as e:
-            logger.error(f"Error processing email {email_msg['id']}: {str(e)}")
+                logger.warning(f"Determined to be unnecessary, but failed to move: '{result['subject'][:50]}...'")
     
     # Step 9: Save and report results
     logger.info("Step 8: Saving results")
     results_file = save_results(
         emails_processed=emails_processed,
         unnecessary_emails=unnecessary_emails,
-        results_dir=config.RESULTS_DIR
+        results_dir=cfg.RESULTS_DIR,
+        pretty=cfg.RESULTS_PRETTY
     )
     
     # Final report
@@ -0,0 +1,116 @@
+"""
+Result cache module.
+Persists email verdicts across runs so unchanged emails are not re-analyzed.
+"""
+
+import os
+import sqlite3
+import time
+from loguru import logger
+from utils.file_utils import ensure_directory_exists
+
+class ResultCache:
+    """SQLite cache of email verdicts, keyed by Gmail message ID, model and classifier version."""
+    
+    def __init__(self, path='results/cache.db', model='', version=''):
+        """
+        Open (or create) the result cache.
+        
+        Args:
+            path (str): Path to the SQLite database file
+            model (str): LLM model name; verdicts from other models are ignored
+            version (str): Classifier version; verdicts from other prompts or
+                           pre-filter rules are ignored
+        
+        Raises:
+            sqlite3.Error: If the database cannot be opened or created
+        """
+        self.path = path
+        # Stored in the model column, so a new version simply misses old rows
+        self.model = f"{model}@{version}" if version else model
+        
+        ensure_directory_exists(os.path.dirname(path))
+        self._conn = sqlite3.connect(path)
+        try:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "msg_id TEXT NOT NULL, model TEXT NOT NULL, verdict INTEGER NOT NULL, "
+                "subject TEXT, sender TEXT, ts INTEGER NOT NULL, "
+                "PRIMARY KEY (msg_id, model))"
+            )
+            self._conn.commit()
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+        logger.debug(f"Opened result cache {path} for model: {self.model}")
+    
+    def get(self, msg_id):
+        """
+        Look up the cached result for an email.
+        
+        Args:
+            msg_id (str): Email message ID
+        
+        Returns:
+            dict or None: Result with id, subject, sender and is_necessary,
+                          or None if the email has not been analyzed yet
+                          or the cache cannot be read
+        """
+        try:
+            row = self._conn.execute(
+                "SELECT verdict, subject, sender FROM verdicts WHERE msg_id = ? AND model = ?",
+                (msg_id, self.model)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading result cache {self.path}: {str(e)}")
+            return None
+        if row is None:
+            return None
+        
+        verdict, subject, sender = row
+        return {
+            'id': msg_id,
+            'subject': subject,
+            'sender': sender,
+            'is_necessary': bool(verdict)
+        }
+    
+    def put(self, result):
+        """
+        Store the result for a single email.
+        
+        Args:
+            result (dict): Result with id, subject, sender and is_necessary
+        """
+        self.put_many([result])
+    
+    def put_many(self, results):
+        """
+        Store the results for several emails in one transaction.
+        
+        Failures are logged and otherwise ignored; the results are then simply
+        analyzed again on the next run.
+        
+        Args:
+            results (list): Results with id, subject, sender and is_necessary
+        """
+        now = int(time.time())
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO verdicts (msg_id, model, verdict, subject, sender, ts) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (result['id'], self.model, int(result['is_necessary']),
+                         result.get('subject'), result.get('sender'), now)
+                        for result in results
+                    ]
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Error writing result cache {self.path}: {str(e)}")
+            return
+        logger.debug(f"Cached {len(results)} results")
+    
+    def close(self):
+        """Close the underlying database connection."""
+        self._conn.close()
@@ -4,10 +4,6 @@ Handles OAuth2 authentication with Gmail API.
 """
 
 import os
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from loguru import logger
 
 def authenticate_gmail(scopes, credentials_file, token_file):
@@ -26,6 +22,12 @@ def authenticate_gmail(scopes, credentials_file, token_file):
         FileNotFoundError: If credentials file doesn't exist
         Exception: For any other authentication errors
     """
+    # The Google client libraries are slow to import, so load them on first use
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+    from googleapiclient.discovery import build
+    
     logger.info("Authenticating with Gmail API")
     creds = None
     
@@ -60,4 +62,25 @@ def authenticate_gmail(scopes, credentials_file, token_file):
             token.write(creds.to_json())
     
     logger.info("Gmail authentication successful")
-    return build('gmail', 'v1', credentials=creds)
\ No newline at end of file
+    # Use the discovery document bundled with google-api-python-client
+    # instead of downloading it
+    return build('gmail', 'v1', credentials=creds, static_discovery=True, cache_discovery=False)
+
+def create_thread_http(service):
+    """
+    Create a new authorized HTTP object for use from a worker thread.
+    
+    httplib2.Http objects are not thread-safe, so each thread that executes
+    requests must pass its own instance to request.execute(http=...).
+    
+    Args:
+        service: Authenticated Gmail API service
+    
+    Returns:
+        AuthorizedHttp: HTTP object using the service's credentials
+    """
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.http import build_http
+    
+    # build_http applies the client library's default socket timeout
+    return AuthorizedHttp(service._http.credentials, http=build_http())
@@ -3,12 +3,41 @@ Gmail email operations module.
 Handles retrieval and modification of emails.
 """
 
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from googleapiclient.errors import HttpError
 from loguru import logger
+from modules.gmail.auth import create_thread_http
 from utils.email_parser import parse_email_content
+from utils.retry import retry
 
-def get_emails(service, user_id='me', label_ids=None, max_results=100, retry_attempts=3, retry_delay=2):
+# Maximum number of message IDs accepted by a single messages.batchModify call
+BATCH_MODIFY_LIMIT = 1000
+
+# Headers requested when fetching emails with format='metadata'
+METADATA_HEADERS = ['Subject', 'From', 'Date', 'List-Unsubscribe', 'Precedence']
+
+# Per-thread HTTP objects for requests executed from worker threads
+_thread_local = threading.local()
+
+def _get_thread_http(service):
+    """
+    Get the calling thread's HTTP object, creating it on first use.
+    
+    Args:
+        service: Gmail API service instance
+    
+    Returns:
+        AuthorizedHttp: HTTP object owned by the current thread
+    """
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = create_thread_http(service)
+        _thread_local.http = http
+    return http
+
+@retry(HttpError, attempts=3, base=2)
+def get_emails(service, user_id='me', label_ids=None, max_results=100):
     """
     Get emails from Gmail with specified labels.
     
@@ -18,7 +47,7 @@ def get_emails(service, user_id='me', label_ids=None, max_results=100, retry_att
         label_ids (list): List of label IDs to filter by (default: ['INBOX'])
         max_results (int): Maximum number of emails to retrieve
         retry_attempts (int): Number of retry attempts for API calls
-        retry_delay (int): Delay between retries in seconds
+        retry_delay (int): Base delay between retries in seconds
         
     Returns:
         list: List of message objects
@@ -28,64 +57,86 @@ def get_emails(service, user_id='me', label_ids=None, max_results=100, retry_att
         
     logger.info(f"Fetching up to {max_results} emails with labels: {label_ids}")
     
-    # Retry mechanism for API calls
-    for attempt in range(retry_attempts):
-        try:
-            results = service.users().messages().list(
-                userId=user_id, labelIds=label_ids, maxResults=max_results
-            ).execute()
-            
-            messages = results.get('messages', [])
-            logger.info(f"Found {len(messages)} emails")
-            return messages
-        except HttpError as error:
-            if attempt < retry_attempts - 1:
-                logger.warning(f"Error getting emails (attempt {attempt+1}/{retry_attempts}): {error}")
-                time.sleep(retry_delay)
-            else:
-                logger.error(f"Failed to get emails after {retry_attempts} attempts: {error}")
-                raise
+    results = service.users().messages().list(
+        userId=user_id, labelIds=label_ids, maxResults=max_results
+    ).execute()
     
-    return []
+    messages = results.get('messages', [])
+    logger.info(f"Found {len(messages)} emails")
+    return messages
 
-def get_email_content(service, msg_id, user_id='me', retry_attempts=3, retry_delay=2):
+@retry(HttpError, attempts=3, base=2)
+def get_email_content(service, msg_id, user_id='me', http=None, fmt='full', body_preview_length=None):
     """
     Get the content of an email with ID msg_id.
     
+    With fmt='metadata' only the headers and snippet are downloaded and the
+    returned body is empty.
+    
     Args:
         service: Gmail API service instance
         msg_id (str): Email message ID
         user_id (str): User ID, 'me' for authenticated user
         retry_attempts (int): Number of retry attempts for API calls
-        retry_delay (int): Delay between retries in seconds
+        retry_delay (int): Base delay between retries in seconds
+        http (optional): HTTP object to execute the request with (for worker threads)
+        fmt (str): Message format to request ('full' or 'metadata')
+        body_preview_length (int, optional): Truncate the body to this many characters
         
     Returns:
-        dict: Email content including headers and body
+        Email: Email content including headers and body
+    """
+    logger.debug("Getting {} content for email {}", fmt, msg_id)
+    
+    request_args = {'userId': user_id, 'id': msg_id, 'format': fmt}
+    if fmt == 'metadata':
+        request_args['metadataHeaders'] = METADATA_HEADERS
+    
+    message = service.users().messages().get(**request_args).execute(http=http)
+    
+    # Parse the email content
+    return parse_email_content(message, body_preview_length=body_preview_length)
+
+def get_email_contents(service, msg_ids, user_id='me', max_workers=8, retry_attempts=3, retry_delay=2, fmt='full',
+                       body_preview_length=None):
+    """
+    Get the content of several emails concurrently.
+    
+    Args:
+        service: Gmail API service instance
+        msg_ids (list): Email message IDs
+        user_id (str): User ID, 'me' for authenticated user
+        max_workers (int): Number of worker threads issuing requests
+        retry_attempts (int): Number of retry attempts for API calls
+        retry_delay (int): Base delay between retries in seconds
+        fmt (str): Message format to request ('full' or 'metadata')
+        body_preview_length (int, optional): Truncate bodies to this many characters
+    
+    Returns:
+        list: Email records in the order of msg_ids; emails that
+              could not be fetched are logged and left out
     """
-    logger.debug(f"Getting content for email {msg_id}")
+    logger.debug(f"Getting content for {len(msg_ids)} emails with {max_workers} workers")
     
-    # Retry mechanism for API calls
-    for attempt in range(retry_attempts):
+    def fetch(msg_id):
         try:
-            message = service.users().messages().get(
-                userId=user_id, id=msg_id, format='full'
-            ).execute()
-            
-            # Parse the email content
-            email_data = parse_email_content(message)
-            return email_data
-            
-        except HttpError as error:
-            if attempt < retry_attempts - 1:
-                logger.warning(f"Error getting email content (attempt {attempt+1}/{retry_attempts}): {error}")
-                time.sleep(retry_delay)
-            else:
-                logger.error(f"Failed to get email content after {retry_attempts} attempts: {error}")
-                raise
+            return get_email_content(
+                service, msg_id, user_id=user_id,
+                retry_attempts=retry_attempts, retry_delay=retry_delay,
+                http=_get_thread_http(service), fmt=fmt,
+                body_preview_length=body_preview_length
+            )
+        except Exception as e:
+            logger.error(f"Error fetching email {msg_id}: {str(e)}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        contents = list(executor.map(fetch, msg_ids))
     
-    raise Exception(f"Failed to get email content for {msg_id}")
+    return [email_data for email_data in contents if email_data is not None]
 
-def move_to_label(service, msg_id, label_id, user_id='me', retry_attempts=3, retry_delay=2):
+@retry(HttpError, attempts=3, base=2)
+def move_to_label(service, msg_id, label_id, user_id='me', http=None):
     """
     Move an email to a specific label and remove from inbox.
     
@@ -95,32 +146,102 @@ def move_to_label(service, msg_id, label_id, user_id='me', retry_attempts=3, ret
         label_id (str): Label ID to add
         user_id (str): User ID, 'me' for authenticated user
         retry_attempts (int): Number of retry attempts for API calls
-        retry_delay (int): Delay between retries in seconds
+        retry_delay (int): Base delay between retries in seconds
+        http (optional): HTTP object to execute the request with (for worker threads)
         
     Returns:
         bool: True if successful, False otherwise
     """
-    logger.debug(f"Moving email {msg_id} to label {label_id}")
+    logger.debug("Moving email {} to label {}", msg_id, label_id)
+    
+    service.users().messages().modify(
+        userId=user_id,
+        id=msg_id,
+        body={
+            'addLabelIds': [label_id],
+            'removeLabelIds': ['INBOX']
+        }
+    ).execute(http=http)
+    logger.debug("Successfully moved email {}", msg_id)
+    return True
+
+@retry(HttpError, attempts=3, base=2)
+def _batch_move_to_label(service, msg_ids, label_id, user_id='me'):
+    """
+    Move up to BATCH_MODIFY_LIMIT emails to a label with one batchModify call.
     
-    # Retry mechanism for API calls
-    for attempt in range(retry_attempts):
+    Args:
+        service: Gmail API service instance
+        msg_ids (list): Email message IDs
+        label_id (str): Label ID to add
+        user_id (str): User ID, 'me' for authenticated user
+    """
+    service.users().messages().batchModify(
+        userId=user_id,
+        body={
+            'ids': msg_ids,
+            'addLabelIds': [label_id],
+            'removeLabelIds': ['INBOX']
+        }
+    ).execute()
+
+def move_many_to_label(service, msg_ids, label_id, user_id='me', retry_attempts=3, retry_delay=2,
+                       refresh_label=None):
+    """
+    Move several emails to a specific label and remove them from inbox.
+    
+    Uses messages.batchModify, which updates up to 1000 emails per request.
+    
+    Args:
+        service: Gmail API service instance
+        msg_ids (list): Email message IDs
+        label_id (str): Label ID to add
+        user_id (str): User ID, 'me' for authenticated user
+        retry_attempts (int): Number of retry attempts for API calls
+        retry_delay (int): Base delay between retries in seconds
+        refresh_label (callable, optional): Returns a freshly looked-up label ID;
+                                            called once if a batchModify call is
+                                            rejected with 400 or 404, which happens
+                                            when label_id no longer exists
+    
+    Returns:
+        list: IDs of the emails that were moved successfully
+    """
+    logger.debug(f"Moving {len(msg_ids)} emails to label {label_id}")
+    
+    moved = []
+    start = 0
+    while start < len(msg_ids):
+        chunk = msg_ids[start:start + BATCH_MODIFY_LIMIT]
+        rejected = False
         try:
-            service.users().messages().modify(
-                userId=user_id,
-                id=msg_id,
-                body={
-                    'addLabelIds': [label_id],
-                    'removeLabelIds': ['INBOX']
-                }
-            ).execute()
-            logger.debug(f"Successfully moved email {msg_id}")
-            return True
+            _batch_move_to_label(
+                service, chunk, label_id, user_id=user_id,
+                retry_attempts=retry_attempts, retry_delay=retry_delay
+            )
+            logger.debug(f"Successfully moved {len(chunk)} emails")
+            moved.extend(chunk)
         except HttpError as error:
-            if attempt < retry_attempts - 1:
-                logger.warning(f"Error moving email (attempt {attempt+1}/{retry_attempts}): {error}")
-                time.sleep(retry_delay)
+            rejected = refresh_label is not None and error.resp.status in (400, 404)
+            if rejected:
+                logger.warning(f"Label {label_id} was rejected, looking it up again: {error}")
             else:
-                logger.error(f"Failed to move email after {retry_attempts} attempts: {error}")
-                raise
+                logger.error(f"Failed to move {len(chunk)} emails: {error}")
+        except Exception as e:
+            # Transport and auth errors (timeouts, resets, token refresh) are
+            # not HttpErrors; keep them from aborting the remaining chunks
+            logger.error(f"Failed to move {len(chunk)} emails: {str(e)}")
+        
+        if rejected:
+            # The label may have been deleted in Gmail since its ID was cached;
+            # retry this chunk once with the label looked up again
+            refresh, refresh_label = refresh_label, None
+            try:
+                label_id = refresh()
+                continue
+            except Exception as e:
+                logger.error(f"Failed to look up label again, {len(chunk)} emails not moved: {str(e)}")
+        
+        start += BATCH_MODIFY_LIMIT
     
-    return False
\ No newline at end of file
+    return moved
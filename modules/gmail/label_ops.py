@@ -3,93 +3,163 @@ Gmail label operations module.
 Handles creation and management of labels.
 """
 
-import time
+import os
 from googleapiclient.errors import HttpError
 from loguru import logger
+from utils import json_utils
+from utils.file_utils import ensure_directory_exists
+from utils.retry import retry
 
-def ensure_label_exists(service, label_name, user_id='me', retry_attempts=3, retry_delay=2):
+# Labels fetched from the API, keyed by (id(service), user_id)
+_LABELS_BY_SERVICE = {}
+
+# Account -> (label name -> label ID) maps loaded from label cache files, keyed by file path
+_LABEL_CACHE = {}
+
+def _get_labels(service, user_id):
+    """
+    Get the user's labels, fetching them from the API only once per service.
+    
+    Args:
+        service: Gmail API service instance
+        user_id (str): User ID, 'me' for authenticated user
+    
+    Returns:
+        list: Cached list of label objects
+    """
+    key = (id(service), user_id)
+    if key not in _LABELS_BY_SERVICE:
+        results = service.users().labels().list(userId=user_id).execute()
+        _LABELS_BY_SERVICE[key] = results.get('labels', [])
+    return _LABELS_BY_SERVICE[key]
+
+def _load_label_cache(cache_file):
+    """
+    Load the label ID maps stored in cache_file, reading it only once.
+    
+    Args:
+        cache_file (str): Path to the label cache JSON file
+    
+    Returns:
+        dict: Account -> (label name -> label ID) map (empty if the file is
+              missing or invalid)
+    """
+    if cache_file not in _LABEL_CACHE:
+        accounts = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as f:
+                    data = json_utils.loads(f.read())
+                # Skip entries written before the cache was keyed by account
+                accounts = {account: ids for account, ids in data.items() if isinstance(ids, dict)}
+                logger.debug(f"Loaded label IDs of {len(accounts)} accounts from {cache_file}")
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"Error reading label cache {cache_file}: {str(e)}")
+        _LABEL_CACHE[cache_file] = accounts
+    return _LABEL_CACHE[cache_file]
+
+def _save_label_cache(cache_file):
+    """
+    Write the label ID maps for cache_file back to disk.
+    
+    Args:
+        cache_file (str): Path to the label cache JSON file
+    """
+    ensure_directory_exists(os.path.dirname(cache_file))
+    try:
+        with open(cache_file, 'wb') as f:
+            f.write(json_utils.dumps(_LABEL_CACHE[cache_file], pretty=True))
+    except OSError as e:
+        logger.warning(f"Error saving label cache {cache_file}: {str(e)}")
+
+@retry(HttpError, attempts=3, base=2)
+def ensure_label_exists(service, label_name, user_id='me', cache_file=None, account=None, refresh=False):
     """
     Ensure a label exists, creating it if necessary. Returns label ID.
     
+    When cache_file is given, label IDs found or created are stored there per
+    account and reused on later runs without calling the API. If a cached ID
+    is rejected later, call again with refresh=True to look the label up anew.
+    
     Args:
         service: Gmail API service instance
         label_name (str): Name of the label
         user_id (str): User ID, 'me' for authenticated user
+        cache_file (str, optional): Path to a JSON file caching label IDs
+        account (str, optional): Key of the account in cache_file, such as the
+                                 token file path (defaults to user_id)
+        refresh (bool): Ignore the cached ID and the labels fetched earlier
         retry_attempts (int): Number of retry attempts for API calls
-        retry_delay (int): Delay between retries in seconds
-        
+        retry_delay (int): Base delay between retries in seconds
+    
     Returns:
         str: Label ID
-        
+    
     Raises:
-        Exception: If unable to ensure label exists after retries
+        HttpError: If unable to ensure label exists after retries
     """
     logger.info(f"Ensuring label '{label_name}' exists")
     
-    # Retry mechanism for API calls
-    for attempt in range(retry_attempts):
-        try:
-            # List all labels
-            results = service.users().labels().list(userId=user_id).execute()
-            labels = results.get('labels', [])
-            
-            # Check if our label exists
-            for label in labels:
-                if label['name'] == label_name:
-                    logger.info(f"Label '{label_name}' already exists with ID: {label['id']}")
-                    return label['id']
-            
-            # If not, create it
-            logger.info(f"Label '{label_name}' not found, creating it")
-            label_object = {
-                'name': label_name,
-                'labelListVisibility': 'labelShow',
-                'messageListVisibility': 'show'
-            }
-            created_label = service.users().labels().create(
-                userId=user_id, body=label_object
-            ).execute()
-            logger.info(f"Created label '{label_name}' with ID: {created_label['id']}")
-            return created_label['id']
-            
-        except HttpError as error:
-            if attempt < retry_attempts - 1:
-                logger.warning(f"Error with labels (attempt {attempt+1}/{retry_attempts}): {error}")
-                time.sleep(retry_delay)
-            else:
-                logger.error(f"Failed to ensure label exists after {retry_attempts} attempts: {error}")
-                raise
-    
-    raise Exception(f"Failed to ensure label '{label_name}' exists after multiple attempts")
+    label_ids = {}
+    if cache_file:
+        cache = _load_label_cache(cache_file)
+        label_ids = cache.setdefault(account or user_id, {})
+    
+    if refresh:
+        label_ids.pop(label_name, None)
+        _LABELS_BY_SERVICE.pop((id(service), user_id), None)
+    elif label_name in label_ids:
+        logger.info(f"Using cached ID for label '{label_name}': {label_ids[label_name]}")
+        return label_ids[label_name]
+    
+    # Check if our label exists
+    labels = _get_labels(service, user_id)
+    label_id = None
+    for label in labels:
+        if label['name'] == label_name:
+            logger.info(f"Label '{label_name}' already exists with ID: {label['id']}")
+            label_id = label['id']
+            break
+    
+    # If not, create it
+    if label_id is None:
+        logger.info(f"Label '{label_name}' not found, creating it")
+        label_object = {
+            'name': label_name,
+            'labelListVisibility': 'labelShow',
+            'messageListVisibility': 'show'
+        }
+        created_label = service.users().labels().create(
+            userId=user_id, body=label_object
+        ).execute()
+        labels.append(created_label)
+        logger.info(f"Created label '{label_name}' with ID: {created_label['id']}")
+        label_id = created_label['id']
+    
+    if cache_file:
+        label_ids[label_name] = label_id
+        _save_label_cache(cache_file)
+    
+    return label_id
 
-def list_labels(service, user_id='me', retry_attempts=3, retry_delay=2):
+@retry(HttpError, attempts=3, base=2)
+def list_labels(service, user_id='me'):
     """
     List all available labels for the user.
     
+    Labels are fetched from the API once per service; later calls reuse them.
+    
     Args:
         service: Gmail API service instance
         user_id (str): User ID, 'me' for authenticated user
         retry_attempts (int): Number of retry attempts for API calls
-        retry_delay (int): Delay between retries in seconds
-        
+        retry_delay (int): Base delay between retries in seconds
+    
     Returns:
         list: List of label objects
     """
     logger.debug("Fetching all available labels")
     
-    # Retry mechanism for API calls
-    for attempt in range(retry_attempts):
-        try:
-            results = service.users().labels().list(userId=user_id).execute()
-            labels = results.get('labels', [])
-            logger.debug(f"Found {len(labels)} labels")
-            return labels
-        except HttpError as error:
-            if attempt < retry_attempts - 1:
-                logger.warning(f"Error listing labels (attempt {attempt+1}/{retry_attempts}): {error}")
-                time.sleep(retry_delay)
-            else:
-                logger.error(f"Failed to list labels after {retry_attempts} attempts: {error}")
-                raise
-    
-    return []
\ No newline at end of file
+    labels = list(_get_labels(service, user_id))
+    logger.debug(f"Found {len(labels)} labels")
+    return labels
@@ -3,221 +3,426 @@ Email analyzer module.
 Uses LLM to determine if an email is necessary or not.
 """
 
+import hashlib
+import re
 from loguru import logger
 
+# Classification rubric, sent once per request as part of the system prompt
+_RUBRIC = """
+NECESSARY (answer YES): order-confirmation, shipping, delivery, return, refund, bank-transaction, card-statement, bill, receipt, donation-receipt, tax, personal, reply-to-my-inquiry, work, project-review, meeting, calendar, security-alert, requested-password-reset, verification-code, account-change, travel, boarding-pass, reservation, ticket, appointment, course, assignment-feedback, school-notice, action-required, legal, time-sensitive.
+UNNECESSARY (answer NO): marketing, promo, sale, limited-time-offer, discount, product-recommendation, deals, newsletter, social-notify, news-digest, app-summary, we-miss-you, platform-update, bulk, personalized-mass-mail, credit-card-offer, loan-offer, insurance-promo, investment-offer, banking-privileges-offer, blog, publication, rss, video-channel, profile-view, forum-digest, like-comment-notify, see-whats-new, repeated-reminder, duplicate-notify, follow-up-marketing.
+Judge whether the sender is a person, company or automated system, whether the subject uses action words or marketing language, and whether the content is specific to me or generic.
+"""
+
+# System prompt shared by every request, so Ollama can reuse its cached prefix
+_SYSTEM_PROMPT = """
+You are an AI assistant that analyzes emails to determine if they are necessary to keep in the inbox.
+Decide using the following rules.
+""" + _RUBRIC
+
+# Single-email prompt; only the email fields are filled in per call
+_PROMPT_TEMPLATE = """
+I need to determine if this email is necessary to keep in my inbox. Analyze it carefully.
+
+Subject: {subject}
+From: {sender}
+Date: {date}
+
+Email snippet: {snippet}
+
+Email content:
+{body}
+
+Answer with ONLY "YES" or "NO" first, followed by a very brief explanation, focusing on the most relevant category that applies.
+"""
+
+# Matches a leading YES/NO verdict in a single-email response
+_VERDICT_RE = re.compile(r'^\s*(YES|NO)\b', re.IGNORECASE)
+
+# Token budget per "<index>": "YES|NO" entry of a batch response
+_TOKENS_PER_VERDICT = 8
+
+# Character budget for the emails of one batch prompt. Together with the system
+# prompt and the verdicts this stays within a 2048-token context window (the
+# num_ctx default of many Ollama versions), which Ollama otherwise truncates
+# from the front, dropping the rubric without warning
+_BATCH_PROMPT_CHARS = 5000
+
+# Characters a batch prompt section adds besides the email fields
+_BATCH_SECTION_OVERHEAD = 60
+
+# Headers that mark an email as bulk mail (lowercase, as stored by parse_email_content)
+_BULK_HEADERS = ('list-unsubscribe',)
+
+# Precedence header values used by bulk and mailing-list mail
+_BULK_PRECEDENCE = ('bulk', 'list', 'junk')
+
+# Bump when the pre-filter rules or the batch prompt change, so verdicts
+# cached by earlier versions are not reused
+_RULES_VERSION = 2
+
+# Digit runs in subjects, replaced so templated subjects share a memo key
+_DIGITS_RE = re.compile(r'\d+')
+
+# Extracts the address from a From header like "Name <user@example.com>"
+_ADDRESS_RE = re.compile(r'<([^>]+)>')
+
 class EmailAnalyzer:
     """Analyzes emails using LLM to determine if they are necessary."""
     
-    def __init__(self, llm_client, body_preview_length=1000):
+    def __init__(self, llm_client, snippet_min_length=150, allowed_senders=None):
         """
         Initialize the email analyzer.
         
         Args:
             llm_client: LLM client (e.g., OpenRouterClient)
-            body_preview_length (int): Length of email body to include in analysis
+            snippet_min_length (int): Snippet length from which headers and snippet
+                                      alone are enough to analyze an email
+            allowed_senders (list, optional): Addresses or domains whose emails
+                                              are always necessary
         """
         self.llm_client = llm_client
-        self.body_preview_length = body_preview_length
-        logger.debug(f"Initialized EmailAnalyzer with body preview length: {body_preview_length}")
+        self.snippet_min_length = snippet_min_length
+        self.allowed_senders = {sender.strip().lower().lstrip('@') for sender in allowed_senders or []}
+        # LLM verdicts of this run, keyed by _memo_key
+        self._memo = {}
+        # Identifies the prompts and rules behind this analyzer's verdicts
+        rules = "\0".join(
+            [str(_RULES_VERSION), _SYSTEM_PROMPT, _PROMPT_TEMPLATE] + sorted(self.allowed_senders)
+        )
+        self.classifier_version = hashlib.sha1(rules.encode('utf-8')).hexdigest()[:12]
+        logger.debug(f"Initialized EmailAnalyzer with snippet min length: {snippet_min_length}")
+        
+        # Load the model and prefill the shared system prompt ahead of the first email
+        try:
+            self.llm_client.preload(_SYSTEM_PROMPT)
+        except Exception as e:
+            logger.warning(f"Error preloading LLM: {str(e)}")
+    
+    def needs_full_content(self, email_data):
+        """
+        Check whether an email needs its full body fetched before analysis.
+        
+        Emails fetched as metadata only have headers and a snippet; when the
+        snippet is long enough it carries enough of the content on its own.
+        Emails the header pre-filter classifies never reach the LLM, so their
+        body is not needed either.
+        
+        Args:
+            email_data (Email): Parsed email including snippet and body
+        
+        Returns:
+            bool: True if the full body should be fetched, False otherwise
+        """
+        if email_data.body or self._fast_classify(email_data) is not None:
+            return False
+        return len(email_data.snippet) < self.snippet_min_length
     
     def check_necessity(self, email_data):
         """
         Use LLM to determine if an email is necessary.
         
         Args:
-            email_data (dict): Email data including subject, sender, date, and body
+            email_data (Email): Parsed email including subject, sender, date, and body
             
         Returns:
             bool: True if necessary, False if unnecessary
         """
-        # Prepare system prompt
-        system_prompt = """
-        You are an AI assistant that analyzes emails to determine if they are necessary to keep in the inbox.
-        You should respond with ONLY "YES" or "NO" followed by a very brief explanation.
-        """
+        # Skip the LLM for emails that are clearly necessary or bulk mail
+        verdict = self._fast_classify(email_data)
+        if verdict is not None:
+            return verdict
+        
+        # Reuse the verdict of an earlier email with the same sender and subject template
+        key = self._memo_key(email_data)
+        if key in self._memo:
+            return self._memo[key]
         
         # Prepare user prompt for the LLM
         prompt = self._create_analysis_prompt(email_data)
         
         try:
-            # Get response from LLM
-            logger.debug(f"Analyzing email: {email_data['subject']}")
-            response_text = self.llm_client.generate_response(prompt, system_prompt)
+            # Get response from LLM; only its leading YES/NO is needed
+            logger.debug("Analyzing email: {}", email_data.subject)
+            response_text = self.llm_client.generate_response(
+                prompt, _SYSTEM_PROMPT, first_word_only=True, max_tokens=4, stop=["\n"]
+            )
             
             # Parse the response
-            return self._parse_necessity_response(response_text, email_data)
+            verdict = self._parse_necessity_response(response_text, email_data)
+            self._memo[key] = verdict
+            return verdict
             
         except Exception as e:
             logger.error(f"Error analyzing email: {str(e)}")
             # In case of any error, default to keeping the email
             return True
     
+    def check_necessity_batch(self, emails, batch_size=10):
+        """
+        Use LLM to determine the necessity of several emails at once.
+        
+        Emails that the header pre-filter can classify skip the LLM; the rest
+        are grouped into batches of at most batch_size emails that fit the
+        model's context window, and each batch is sent as a single prompt.
+        The client may send several batches concurrently. Emails sharing a
+        sender and subject template with an email analyzed earlier reuse its
+        verdict.
+        
+        Args:
+            emails (list): List of parsed Email records
+            batch_size (int): Maximum number of emails per LLM call
+        
+        Returns:
+            list: One entry per email: True if necessary, False if unnecessary,
+                  or None if the LLM gave no usable verdict (treat as necessary)
+        """
+        verdicts = [self._fast_classify(email_data) for email_data in emails]
+        keys = {}
+        queued = set()
+        pending = []
+        repeats = []
+        for i, verdict in enumerate(verdicts):
+            if verdict is not None:
+                continue
+            key = self._memo_key(emails[i])
+            keys[i] = key
+            if key in self._memo:
+                verdicts[i] = self._memo[key]
+            elif key in queued:
+                # Same template as an email already queued for the LLM
+                repeats.append(i)
+            else:
+                queued.add(key)
+                pending.append(i)
+        logger.debug(f"Pre-filter classified {len(emails) - len(keys)} of {len(emails)} emails, "
+                     f"{len(keys) - len(pending)} more reuse an earlier verdict")
+        
+        batches = self._split_batches(emails, pending, batch_size)
+        prompts = [self._create_batch_prompt([emails[i] for i in indexes]) for indexes in batches]
+        
+        logger.debug(f"Analyzing {len(pending)} emails in {len(batches)} batches")
+        responses = self.llm_client.generate_many(
+            prompts, _SYSTEM_PROMPT, max_tokens=_TOKENS_PER_VERDICT * (batch_size + 1), expect_json=True
+        )
+        
+        for indexes, result in zip(batches, responses):
+            if result is None:
+                # The client already logged why the request failed
+                batch_verdicts = {}
+            else:
+                batch_verdicts = self._parse_batch_response(result)
+            
+            for position, i in enumerate(indexes, start=1):
+                verdict = batch_verdicts.get(position)
+                if verdict is None:
+                    logger.warning(f"No verdict for email: {emails[i].subject}. Defaulting to necessary.")
+                else:
+                    self._memo[keys[i]] = verdict
+                verdicts[i] = verdict
+        
+        for i in repeats:
+            verdicts[i] = self._memo.get(keys[i])
+        
+        return verdicts
+    
+    @staticmethod
+    def _split_batches(emails, indexes, batch_size):
+        """
+        Group emails into batches limited both by count and by prompt size.
+        
+        Args:
+            emails (list): List of parsed Email records
+            indexes (list): Indexes into emails of the emails to batch
+            batch_size (int): Maximum number of emails per batch
+        
+        Returns:
+            list: Lists of indexes, one per batch
+        """
+        batches = []
+        batch = []
+        batch_chars = 0
+        for i in indexes:
+            email_data = emails[i]
+            chars = _BATCH_SECTION_OVERHEAD + sum(map(len, (
+                email_data.subject, email_data.sender, email_data.date,
+                email_data.snippet, email_data.body
+            )))
+            # An email too large for the budget still gets a batch of its own
+            if batch and (len(batch) >= batch_size or batch_chars + chars > _BATCH_PROMPT_CHARS):
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(i)
+            batch_chars += chars
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    @staticmethod
+    def _memo_key(email_data):
+        """
+        Build the key under which an email's verdict is memoized.
+        
+        Digits are masked so that subjects generated from the same template
+        (order numbers, dates, counts) map to the same key.
+        
+        Args:
+            email_data (Email): Parsed email including sender and subject
+        
+        Returns:
+            tuple: (sender, normalized subject prefix)
+        """
+        subject = _DIGITS_RE.sub('#', email_data.subject)
+        return email_data.sender, subject[:80]
+    
+    def _fast_classify(self, email_data):
+        """
+        Classify obvious emails from their headers without calling the LLM.
+        
+        Args:
+            email_data (Email): Parsed email including sender and raw headers
+        
+        Returns:
+            bool or None: True for allowed senders, False for bulk mail,
+                          None if the LLM has to decide
+        """
+        sender = email_data.sender
+        match = _ADDRESS_RE.search(sender)
+        address = (match.group(1) if match else sender).strip().lower()
+        
+        if self.allowed_senders and (
+            address in self.allowed_senders or address.rpartition('@')[2] in self.allowed_senders
+        ):
+            logger.debug("Email from allowed sender deemed necessary: {}", email_data.subject)
+            return True
+        
+        # Only mailing-list headers are decisive: no-reply and notification
+        # senders also send security alerts, verification codes and receipts
+        headers = email_data.headers
+        if (
+            any(header in headers for header in _BULK_HEADERS)
+            or headers.get('precedence', '').strip().lower() in _BULK_PRECEDENCE
+        ):
+            logger.debug("Bulk email deemed unnecessary: {}", email_data.subject)
+            return False
+        
+        return None
+    
     def _create_analysis_prompt(self, email_data):
         """
         Create a prompt for the LLM to analyze the email.
         
         Args:
-            email_data (dict): Email data
+            email_data (Email): Parsed email
             
         Returns:
             str: Analysis prompt
         """
-        # Truncate body to specified length
-        body = email_data.get('body', '')[:self.body_preview_length]
-        
-        prompt = f"""
-        I need to determine if this email is necessary to keep in my inbox. Analyze it carefully.
-
-        Subject: {email_data.get('subject', '(No Subject)')}
-        From: {email_data.get('sender', '(No Sender)')}
-        Date: {email_data.get('date', '(No Date)')}
-        
-        Email snippet: {email_data.get('snippet', '(No Snippet)')}
-        
-        Email content:
-        {body}
-        
-        NECESSARY EMAILS (YOU MUST ANSWER "YES" FOR THESE):
-        
-        1. Order Confirmations and Shipping Updates:
-           - Online purchase confirmations (Amazon, eBay, etc.)
-           - Order shipment notifications with tracking numbers
-           - Delivery confirmations
-           - Return or refund confirmations
-        
-        2. Financial Information:
-           - Bank statements and transaction alerts for actual transactions
-           - Credit card statements and alerts for actual charges
-           - Bill payment confirmations
-           - Tax documents and receipts
-           - Receipts for purchases or donations
-        
-        3. Personal Communications:
-           - Emails from friends, family, or colleagues
-           - Direct personal messages (not mass emails with personalization)
-           - Responses to inquiries you've made
-        
-        4. Work and Professional:
-           - Job-related emails from colleagues and clients
-           - Project updates requiring review
-           - Meeting invitations and calendar updates
-           - Emails from your boss or team members
-        
-        5. Account and Security:
-           - Password resets you requested
-           - Security alerts for your accounts
-           - Verification codes
-           - Important account changes (not routine updates)
-        
-        6. Travel and Events:
-           - Flight/hotel/car rental confirmations
-           - Boarding passes
-           - Event tickets
-           - Reservation confirmations
-           - Appointment reminders
-        
-        7. Educational:
-           - Course communications from instructors
-           - Assignment feedback
-           - School announcements affecting you directly
-        
-        8. Required Actions:
-           - Emails that explicitly request your response or action
-           - Legal notices requiring attention
-           - Time-sensitive information
-        
-        UNNECESSARY EMAILS (YOU MUST ANSWER "NO" FOR THESE):
-        
-        1. Marketing and Promotions:
-           - Sales announcements
-           - "Limited time offers"
-           - Discount codes not related to recent purchases
-           - Product recommendations
-           - Newsletter digests
-           - Daily/weekly deals
-        
-        2. Automated Updates:
-           - Social media notifications
-           - News digests or alerts
-           - App usage summaries
-           - "We miss you" emails
-           - Platform updates not requiring action
-        
-        3. Bulk Emails:
-           - Mass marketing emails
-           - Emails sent to many people simultaneously
-           - Promotional content with your name inserted
-        
-        4. Banking Marketing:
-           - Credit card offers
-           - Loan offers
-           - Insurance promotions
-           - Investment opportunities (not actual investments you own)
-           - "Extend your banking privileges" type offers
-        
-        5. Subscriptions and Content:
-           - Blog post notifications
-           - Publication updates
-           - RSS feed emails
-           - YouTube channel updates
-        
-        6. Low-Priority Notifications:
-           - "Someone viewed your profile"
-           - Forum/community digests
-           - Like/comment notifications
-           - "See what's new" emails
-        
-        7. Repetitive Information:
-           - Repeated reminders for the same thing
-           - Duplicate notifications
-           - Follow-up marketing emails
-        
-        Analyze the email content, sender, and subject carefully.
-        For senders, consider if they are a person, company, or automated system.
-        For subject, look for action words, personalization, or marketing language.
-        For content, examine if it contains specific information for me or is generic.
-        
-        Answer with ONLY "YES" or "NO" first, followed by a very brief explanation, focusing on the most relevant category that applies.
-        """
+        prompt = _PROMPT_TEMPLATE.format_map({
+            'subject': email_data.subject,
+            'sender': email_data.sender,
+            'date': email_data.date,
+            'snippet': email_data.snippet or '(No Snippet)',
+            'body': email_data.body
+        })
         
         return prompt
     
+    def _create_batch_prompt(self, emails):
+        """
+        Create a prompt for the LLM to analyze several emails in one call.
+        
+        Args:
+            emails (list): List of parsed Email records
+        
+        Returns:
+            str: Batch analysis prompt
+        """
+        sections = []
+        for i, email_data in enumerate(emails, start=1):
+            sections.append(
+                f"--- EMAIL {i} ---\n"
+                f"Subject: {email_data.subject}\n"
+                f"From: {email_data.sender}\n"
+                f"Date: {email_data.date}\n"
+                f"Snippet: {email_data.snippet or '(No Snippet)'}\n"
+                f"Body: {email_data.body}\n"
+            )
+        
+        count = len(emails)
+        return (
+            f"I need to determine which of these {count} emails are necessary to keep in my inbox. "
+            "Analyze each one carefully.\n\n"
+            + "\n".join(sections)
+            + f'\nRespond with a JSON object with {count} keys, mapping each email number to "YES" or "NO", '
+            'for example {"1": "YES", "2": "NO"}. Answer every email.\n'
+        )
+    
+    def _parse_batch_response(self, result):
+        """
+        Parse a decoded batch LLM response into per-email verdicts.
+        
+        Args:
+            result (dict): JSON object from LLM mapping email numbers to "YES" or "NO"
+        
+        Returns:
+            dict: Maps 1-based email index to True (necessary) or False (unnecessary)
+        """
+        verdicts = {}
+        if not result or not isinstance(result, dict):
+            logger.warning(f"Unexpected response for email batch: {result!r}")
+            return verdicts
+        
+        for key, value in result.items():
+            answer = str(value).strip().upper()
+            try:
+                index = int(key)
+            except ValueError:
+                continue
+            if answer.startswith("YES"):
+                verdicts[index] = True
+            elif answer.startswith("NO"):
+                verdicts[index] = False
+        
+        return verdicts
+    
     def _parse_necessity_response(self, response_text, email_data):
         """
         Parse the LLM response to determine necessity.
         
         Args:
             response_text (str): Response from LLM
-            email_data (dict): Email data for logging purposes
+            email_data (Email): Parsed email, for logging purposes
             
         Returns:
             bool: True if necessary, False if unnecessary
         """
+        subject = email_data.subject
         if not response_text:
-            logger.warning(f"Empty response for email: {email_data.get('subject', '(No Subject)')}")
+            logger.warning(f"Empty response for email: {subject}")
             return True
         
-        # Get first word of response
-        first_word = response_text.split()[0].upper() if response_text.split() else ""
+        # Fast path: a leading YES/NO decides the verdict
+        match = _VERDICT_RE.match(response_text)
+        if match:
+            is_necessary = match.group(1).upper() == "YES"
+            logger.debug("Email deemed {}: {}", 'necessary' if is_necessary else 'unnecessary', subject)
+            return is_necessary
         
-        if first_word == "YES":
-            logger.debug(f"Email deemed necessary: {email_data.get('subject', '(No Subject)')}")
+        # If response is ambiguous, look for YES/NO in the first line
+        first_line = response_text.split('\n', 1)[0].upper()
+        has_yes = "YES" in first_line
+        has_no = "NO" in first_line
+        
+        if has_yes and not has_no:
+            logger.debug("Email deemed necessary (ambiguous response): {}", subject)
             return True
-        elif first_word == "NO":
-            logger.debug(f"Email deemed unnecessary: {email_data.get('subject', '(No Subject)')}")
+        elif has_no and not has_yes:
+            logger.debug("Email deemed unnecessary (ambiguous response): {}", subject)
             return False
         else:
-            # If response is ambiguous, look for YES/NO in the first line
-            first_line = response_text.split('\n')[0].upper() if '\n' in response_text else response_text.upper()
-            
-            if "YES" in first_line and "NO" not in first_line:
-                logger.debug(f"Email deemed necessary (ambiguous response): {email_data.get('subject', '(No Subject)')}")
-                return True
-            elif "NO" in first_line and "YES" not in first_line:
-                logger.debug(f"Email deemed unnecessary (ambiguous response): {email_data.get('subject', '(No Subject)')}")
-                return False
-            else:
-                # Default to keeping email if truly ambiguous
-                logger.warning(f"Ambiguous response for email: {email_data.get('subject', '(No Subject)')}. Defaulting to necessary.")
-                logger.warning(f"Response was: {response_text}")
-                return True
\ No newline at end of file
+            # Default to keeping email if truly ambiguous
+            logger.warning(f"Ambiguous response for email: {subject}. Defaulting to necessary.")
+            logger.warning(f"Response was: {response_text}")
+            return True
\ No newline at end of file
@@ -3,14 +3,21 @@ Ollama integration module.
 Handles communication with local Ollama API for LLM inference.
 """
 
+import re
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from loguru import logger
+from modules.llm import ollama_async
+from utils import json_utils
+
+# Matches text holding a complete first word, i.e. a word followed by a separator
+_FIRST_WORD_RE = re.compile(r'^\W*\w+\W')
 
 class OllamaClient:
     """Client for interacting with the local Ollama API."""
     
-    def __init__(self, api_url, model, timeout=30):
+    def __init__(self, api_url, model, timeout=30, keep_alive='10m', concurrency=4):
         """
         Initialize the Ollama client.
         
@@ -18,13 +25,33 @@ class OllamaClient:
             api_url (str): Ollama API URL (typically http://localhost:11434/api)
             model (str): Model to use for inference (e.g., llama2, mistral)
             timeout (int): Timeout for API requests in seconds
+            keep_alive (str): How long Ollama keeps the model loaded between requests
+            concurrency (int): Maximum number of requests generate_many keeps in flight
         """
         self.api_url = api_url
-        self.generate_url = f"{self.api_url}/generate"
+        self.chat_url = f"{self.api_url}/chat"
+        # Root URL answering health checks, e.g. http://localhost:11434/
+        self.base_url = self.api_url.rsplit('/api', 1)[0] + '/'
         self.model = model
         self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.concurrency = concurrency
+        # Payload fields that are the same for every request
+        self._payload_prefix = {"model": self.model, "keep_alive": self.keep_alive}
+        # Greedy decoding for deterministic responses
+        self._base_options = {"temperature": 0.0, "top_k": 1}
+        # Reuse one HTTP connection for all requests, retrying failed connections
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=Retry(total=3, backoff_factor=0.5))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         logger.debug(f"Initialized Ollama client with model: {model}")
     
+    def close(self):
+        """Close the HTTP connections held by the client."""
+        self.session.close()
+    
     def check_availability(self):
         """
         Check if Ollama API is available.
@@ -34,8 +61,7 @@ class OllamaClient:
         """
         try:
             # Try to connect to Ollama API's base endpoint
-            base_url = self.api_url.replace('/api', '')
-            response = requests.get(f"{base_url}/", timeout=5)
+            response = self.session.get(self.base_url, timeout=5)
             
             if response.status_code == 200:
                 logger.info("Ollama API is available")
@@ -48,45 +74,75 @@ class OllamaClient:
             logger.error(f"Error connecting to Ollama API: {str(e)}")
             return False
     
-    def generate_response(self, prompt, system_prompt=None):
+    def preload(self, system_prompt):
         """
-        Generate a response using the Ollama API.
+        Load the model and process a system prompt ahead of the first request.
+        
+        Ollama keeps the model and its prompt cache for keep_alive, so later
+        requests starting with the same system prompt skip re-processing it.
+        
+        Args:
+            system_prompt (str): System prompt later requests will start with
+        
+        Raises:
+            Exception: If the API call fails
+        """
+        payload = {
+            **self._payload_prefix,
+            "messages": [{"role": "system", "content": system_prompt}],
+            "stream": False,
+            "options": {"num_predict": 1}
+        }
+        
+        try:
+            logger.debug(f"Preloading Ollama model: {self.model}")
+            response = self.session.post(self.chat_url, data=json_utils.dumps(payload), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise Exception(f"Failed to communicate with Ollama: {str(e)}")
+        
+        if response.status_code != 200:
+            raise Exception(f"Ollama API error: {response.text}")
+    
+    def generate_response(self, prompt, system_prompt=None, first_word_only=False, max_tokens=None, stop=None,
+                          expect_json=False):
+        """
+        Generate a response using the Ollama chat API.
+        
+        The system prompt is sent as a separate system message ahead of the
+        user prompt, so consecutive requests share the same cached prefix.
+        The response is streamed and read as Ollama generates it.
         
         Args:
             prompt (str): User prompt
             system_prompt (str, optional): System prompt
+            first_word_only (bool): Stop reading once the first word is complete
+            max_tokens (int, optional): Maximum number of tokens to generate
+            stop (list, optional): Sequences that end generation
+            expect_json (bool): Constrain the model to reply with JSON and decode it
             
         Returns:
-            str: Generated response text
+            str: Generated response text (only its first word if first_word_only),
+                 or the decoded JSON value if expect_json
             
         Raises:
-            Exception: If the API call fails
+            Exception: If the API call fails or the reply is not valid JSON
         """
-        combined_prompt = prompt
-        if system_prompt:
-            combined_prompt = f"{system_prompt}\n\n{prompt}"
-        
-        payload = {
-            "model": self.model,
-            "prompt": combined_prompt,
-            "stream": False,
-            "temperature": 0.0  # Lower temperature for more deterministic responses
-        }
+        payload = self._build_payload(prompt, system_prompt, True, max_tokens, stop, expect_json)
         
         try:
-            logger.debug(f"Sending request to Ollama API with model: {self.model}")
-            response = requests.post(
-                self.generate_url,
-                json=payload,
-                timeout=self.timeout
+            # Brace-style arguments are only formatted when DEBUG is enabled
+            logger.debug("Sending request to Ollama API with model: {}", self.model)
+            response = self.session.post(
+                self.chat_url,
+                data=json_utils.dumps(payload),
+                timeout=self.timeout,
+                stream=True
             )
             
             if response.status_code == 200:
-                result = response.json()
-                # Extract the response text from the completion
-                response_text = result.get("response", "").strip()
+                response_text = self._read_stream(response, first_word_only)
                 logger.debug("Successfully received response from Ollama")
-                return response_text
+                return self._decode_json(response_text) if expect_json else response_text
             else:
                 logger.error(f"Ollama API returned status code {response.status_code}")
                 logger.error(f"Response: {response.text}")
@@ -94,4 +150,144 @@ class OllamaClient:
                 
         except requests.RequestException as e:
             logger.error(f"Request exception when calling Ollama: {str(e)}")
-            raise Exception(f"Failed to communicate with Ollama: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to communicate with Ollama: {str(e)}")
+    
+    def generate_many(self, prompts, system_prompt=None, max_tokens=None, expect_json=False):
+        """
+        Generate responses for several prompts.
+        
+        With aiohttp installed, up to self.concurrency requests are sent at
+        once so Ollama can work on the next prompt while a response is read;
+        otherwise the prompts are sent one after another.
+        
+        Args:
+            prompts (list): User prompts
+            system_prompt (str, optional): System prompt shared by all prompts
+            max_tokens (int, optional): Maximum number of tokens to generate per response
+            expect_json (bool): Constrain the model to reply with JSON and decode it
+        
+        Returns:
+            list: Response text (or decoded JSON value if expect_json) for each
+                  prompt, or None where the API call failed
+        """
+        if not ollama_async.is_available() or len(prompts) < 2:
+            responses = []
+            for prompt in prompts:
+                try:
+                    responses.append(self.generate_response(
+                        prompt, system_prompt, max_tokens=max_tokens, expect_json=expect_json
+                    ))
+                except Exception as e:
+                    logger.error(f"Error generating response: {str(e)}")
+                    responses.append(None)
+            return responses
+        
+        bodies = [
+            json_utils.dumps(self._build_payload(prompt, system_prompt, False, max_tokens, None, expect_json))
+            for prompt in prompts
+        ]
+        responses = ollama_async.post_many(
+            self.chat_url, bodies, timeout=self.timeout, concurrency=self.concurrency
+        )
+        
+        for i, response in enumerate(responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                if expect_json:
+                    responses[i] = self._decode_json(response)
+            except Exception as e:
+                logger.error(f"Error generating response: {str(e)}")
+                responses[i] = None
+        return responses
+    
+    def _build_payload(self, prompt, system_prompt, stream, max_tokens, stop, expect_json=False):
+        """
+        Build the chat API payload for a prompt.
+        
+        Args:
+            prompt (str): User prompt
+            system_prompt (str or None): System prompt
+            stream (bool): Whether Ollama should stream the response
+            max_tokens (int or None): Maximum number of tokens to generate
+            stop (list or None): Sequences that end generation
+            expect_json (bool): Ask Ollama to constrain the reply to valid JSON
+        
+        Returns:
+            dict: Request payload
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        options = self._base_options
+        if max_tokens or stop:
+            options = dict(options)
+            if max_tokens:
+                options["num_predict"] = max_tokens
+            if stop:
+                options["stop"] = stop
+        
+        payload = {
+            **self._payload_prefix,
+            "messages": messages,
+            "stream": stream,
+            "options": options
+        }
+        if expect_json:
+            payload["format"] = "json"
+        return payload
+    
+    @staticmethod
+    def _decode_json(response_text):
+        """
+        Decode a reply generated with format=json.
+        
+        Args:
+            response_text (str): Response text
+        
+        Returns:
+            Decoded JSON value
+        
+        Raises:
+            Exception: If the reply is not valid JSON
+        """
+        try:
+            return json_utils.loads(response_text)
+        except ValueError:
+            raise Exception(f"Ollama returned invalid JSON: {response_text[:200]}")
+    
+    def _read_stream(self, response, first_word_only=False):
+        """
+        Read a streamed chat response, one JSON chunk per line.
+        
+        When first_word_only is set, reading stops once the first word is
+        complete; closing the response early makes Ollama stop generating.
+        
+        Args:
+            response (requests.Response): Streaming response from the chat API
+            first_word_only (bool): Stop after the first complete word
+        
+        Returns:
+            str: Response text (up to and including the end of the first word
+                 if first_word_only)
+        
+        Raises:
+            Exception: If Ollama reports an error in the stream
+        """
+        parts = []
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json_utils.loads(line)
+                if "error" in chunk:
+                    raise Exception(f"Ollama API error: {chunk['error']}")
+                # Extract the response text from the assistant message
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done") or (first_word_only and _FIRST_WORD_RE.match(''.join(parts))):
+                    break
+        finally:
+            response.close()
+        return ''.join(parts).strip()
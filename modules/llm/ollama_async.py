@@ -0,0 +1,115 @@
+"""
+Asynchronous Ollama requests module.
+Sends several chat requests concurrently with aiohttp, when it is installed.
+"""
+
+import asyncio
+import random
+from loguru import logger
+from utils import json_utils
+from utils.retry import RETRYABLE_STATUSES
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+def is_available():
+    """
+    Check whether concurrent requests are supported.
+    
+    Returns:
+        bool: True if aiohttp is installed
+    """
+    return aiohttp is not None
+
+async def _post_one(session, semaphore, url, body, retry_attempts, retry_delay):
+    """
+    Send one chat request, retrying on rate limiting and server errors.
+    
+    Args:
+        session (aiohttp.ClientSession): Session to send the request with
+        semaphore (asyncio.Semaphore): Bounds the number of requests in flight
+        url (str): Ollama chat API URL
+        body (bytes): Encoded JSON payload
+        retry_attempts (int): Number of attempts
+        retry_delay (float): Base delay between retries in seconds
+    
+    Returns:
+        str: Generated response text
+    
+    Raises:
+        Exception: If the API call fails after all attempts
+    """
+    async with semaphore:
+        for attempt in range(retry_attempts):
+            try:
+                async with session.post(url, data=body) as response:
+                    if response.status == 200:
+                        result = json_utils.loads(await response.read())
+                        return result.get("message", {}).get("content", "").strip()
+                    
+                    error = Exception(f"Ollama API error: {await response.text()}")
+                    if response.status not in RETRYABLE_STATUSES:
+                        raise error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # asyncio.TimeoutError has an empty message, so fall back to its repr
+                error = Exception(f"Failed to communicate with Ollama: {str(e) or repr(e)}")
+            
+            if attempt == retry_attempts - 1:
+                raise error
+            wait = min(30, retry_delay * 2 ** attempt) + random.uniform(0, retry_delay)
+            logger.warning(f"Ollama request failed (attempt {attempt+1}/{retry_attempts}), retrying in {wait:.1f}s: {error}")
+            await asyncio.sleep(wait)
+
+async def _post_all(url, bodies, timeout, concurrency, retry_attempts, retry_delay):
+    """
+    Send all chat requests over one connection pool.
+    
+    Args:
+        url (str): Ollama chat API URL
+        bodies (list): Encoded JSON payloads
+        timeout (int): Connect timeout, and read timeout per queued request, in seconds
+        concurrency (int): Maximum number of requests in flight
+        retry_attempts (int): Number of attempts per request
+        retry_delay (float): Base delay between retries in seconds
+    
+    Returns:
+        list: Response text or the raised exception, one per body
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # Like the requests timeout of the sync path, bound connecting and each
+    # socket read rather than the whole request. A non-streaming reply sends
+    # nothing until it is generated, so a read may also wait in Ollama's queue
+    # behind up to concurrency - 1 other requests, each allowed timeout seconds
+    client_timeout = aiohttp.ClientTimeout(
+        total=None, sock_connect=timeout, sock_read=timeout * concurrency
+    )
+    connector = aiohttp.TCPConnector(limit_per_host=concurrency, keepalive_timeout=60)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=client_timeout,
+        headers={'Content-Type': 'application/json'}
+    ) as session:
+        return await asyncio.gather(
+            *[_post_one(session, semaphore, url, body, retry_attempts, retry_delay) for body in bodies],
+            return_exceptions=True
+        )
+
+def post_many(url, bodies, timeout=30, concurrency=4, retry_attempts=3, retry_delay=1):
+    """
+    Send several chat requests concurrently and wait for all of them.
+    
+    Args:
+        url (str): Ollama chat API URL
+        bodies (list): Encoded JSON payloads (non-streaming)
+        timeout (int): Connect timeout, and read timeout per queued request, in seconds
+        concurrency (int): Maximum number of requests in flight
+        retry_attempts (int): Number of attempts per request
+        retry_delay (float): Base delay between retries in seconds
+    
+    Returns:
+        list: Response text or the raised exception, in the order of bodies
+    """
+    logger.debug(f"Sending {len(bodies)} requests to Ollama, {concurrency} at a time")
+    return asyncio.run(_post_all(url, bodies, timeout, concurrency, retry_attempts, retry_delay))
@@ -0,0 +1,106 @@
+"""
+Classification quality tests for the analyzer rubric.
+Run against a live Ollama model; skipped unless OLLAMA_TESTS=1 and Ollama is reachable.
+"""
+
+import os
+import unittest
+from config import CONFIG as cfg
+from modules.llm.analyzer import EmailAnalyzer
+from modules.llm.ollama import OllamaClient
+from utils.email_parser import Email
+
+# (subject, sender, body, expected verdict) of emails with an unambiguous verdict
+_LABELED_EMAILS = [
+    ("Your Amazon.com order #112-4456789 has shipped", "Amazon.com <shipment-tracking@amazon.com>",
+     "Your package is on its way. Track your package: UPS 1Z999AA10123456784. Arriving Thursday.", True),
+    ("Security alert: new sign-in on Windows", "Google <no-reply@accounts.google.com>",
+     "We noticed a new sign-in to your Google Account on a Windows device. If this was you, "
+     "you don't need to do anything. If not, we'll help you secure your account.", True),
+    ("Your verification code is 482913", "Acme Bank <noreply@acmebank.com>",
+     "Use 482913 to verify your identity. This code expires in 10 minutes. Do not share it.", True),
+    ("Re: dinner on Saturday?", "Priya Raman <priya.raman@gmail.com>",
+     "Sounds great! Let's meet at 7 at the usual place. Can you bring the board game?", True),
+    ("Meeting invitation: Q3 planning review, Tue 10:00", "Dana Whitfield <dana.whitfield@contoso.com>",
+     "Hi team, please review the attached roadmap before Tuesday's planning meeting and come with questions.", True),
+    ("Boarding pass: flight UA 1542 SFO to ORD", "United Airlines <unitedairlines@united.com>",
+     "You're checked in. Your boarding pass for flight UA 1542 departing 8:05 AM, seat 14C, is attached.", True),
+    ("FLASH SALE: 50% off everything, today only!", "StyleHub <deals@stylehub-mail.com>",
+     "Don't miss out! Our biggest sale of the season ends at midnight. Shop now and save on new arrivals.", False),
+    ("You have 12 new notifications", "Facebook <notification@facebookmail.com>",
+     "Alex and 11 others liked your post. See what your friends have been up to.", False),
+    ("You're pre-approved for a Platinum credit card", "Acme Bank Offers <offers@acmebank.com>",
+     "Enjoy 0% intro APR and 3x points on dining. Apply in minutes to extend your banking privileges.", False),
+    ("We miss you! Here's 20% off your next order", "FoodDash <hello@fooddash.com>",
+     "It's been a while. Come back and enjoy 20% off with code COMEBACK20.", False),
+    ("This week's top stories in tech", "TechDigest Weekly <newsletter@techdigest.io>",
+     "1. Chip makers race to 2nm. 2. The best laptops of the year. 3. Why everyone is talking about AI.", False),
+    ("3 people viewed your profile", "LinkedIn <messages-noreply@linkedin.com>",
+     "See who's looking at your profile and grow your network with Premium.", False),
+]
+
+def _labeled_email(index, subject, sender, body):
+    """
+    Build an Email record for a labeled example.
+    
+    Args:
+        index (int): Position of the example, used as its ID
+        subject (str): Subject line
+        sender (str): From header
+        body (str): Plain-text body
+    
+    Returns:
+        Email: Parsed email without bulk-mail headers, so the LLM decides
+    """
+    return Email(
+        id=str(index),
+        subject=subject,
+        sender=sender,
+        date="Mon, 6 May 2024 09:30:00 +0000",
+        body=body,
+        labels=['INBOX'],
+        snippet=body[:100],
+        headers={}
+    )
+
+@unittest.skipUnless(os.getenv('OLLAMA_TESTS') == '1', "set OLLAMA_TESTS=1 to run tests against Ollama")
+class RubricQualityTest(unittest.TestCase):
+    """Checks verdicts of the configured model on a small labeled set."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.client = OllamaClient(
+            api_url=cfg.OLLAMA_API_URL,
+            model=cfg.OLLAMA_MODEL,
+            timeout=cfg.OLLAMA_TIMEOUT,
+            keep_alive=cfg.OLLAMA_KEEP_ALIVE,
+            concurrency=cfg.OLLAMA_CONCURRENCY
+        )
+        if not cls.client.check_availability():
+            cls.client.close()
+            raise unittest.SkipTest(f"Ollama is not reachable at {cfg.OLLAMA_API_URL}")
+        cls.emails = [
+            _labeled_email(i, subject, sender, body)
+            for i, (subject, sender, body, _) in enumerate(_LABELED_EMAILS)
+        ]
+        cls.expected = [expected for *_, expected in _LABELED_EMAILS]
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+    
+    def test_single_email_verdicts(self):
+        analyzer = EmailAnalyzer(self.client)
+        for email_data, expected in zip(self.emails, self.expected):
+            with self.subTest(subject=email_data.subject):
+                self.assertEqual(analyzer.check_necessity(email_data), expected)
+    
+    def test_batch_verdicts(self):
+        analyzer = EmailAnalyzer(self.client)
+        verdicts = analyzer.check_necessity_batch(self.emails, batch_size=cfg.BATCH_SIZE)
+        for email_data, verdict, expected in zip(self.emails, verdicts, self.expected):
+            with self.subTest(subject=email_data.subject):
+                self.assertEqual(verdict, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,82 +3,139 @@ Email parser utility.
 Handles parsing and extraction of email content.
 """
 
-import base64
 import re
+from dataclasses import dataclass
 from html import unescape
 from loguru import logger
 
-def parse_email_content(message):
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# pybase64 is a drop-in, SIMD-accelerated replacement for the base64 module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Patterns used to clean up email bodies, compiled once at import.
+# _RE_HTML matches script, style and head sections with their content, or any other tag.
+_RE_HTML = re.compile(
+    r'<script\b.*?</script>|<style\b.*?</style>|<head\b.*?</head>|<[^>]+>',
+    re.DOTALL | re.IGNORECASE
+)
+
+if msgspec is not None:
+    class Email(msgspec.Struct, gc=False):
+        """Parsed email, stored as a compact msgspec struct."""
+        
+        id: str
+        subject: str
+        sender: str
+        date: str
+        body: str
+        labels: list
+        snippet: str
+        # Lowercase header names mapped to their values
+        headers: dict
+else:
+    @dataclass
+    class Email:
+        """Parsed email (install msgspec for a more compact representation)."""
+        
+        id: str
+        subject: str
+        sender: str
+        date: str
+        body: str
+        labels: list
+        snippet: str
+        # Lowercase header names mapped to their values
+        headers: dict
+
+def parse_email_content(message, body_preview_length=None):
     """
     Parse Gmail API message into structured email content.
     
+    Messages fetched with format='metadata' carry no body parts, so their
+    body is returned as an empty string.
+    
     Args:
         message (dict): Gmail API message object
+        body_preview_length (int, optional): Truncate the body to this many characters
         
     Returns:
-        dict: Structured email content with headers and body
+        Email: Structured email content with headers and body
     """
+    payload = message['payload']
+    
     # Extract headers
-    headers = {}
-    for header in message['payload']['headers']:
-        headers[header['name'].lower()] = header['value']
+    headers = {header['name'].lower(): header['value'] for header in payload['headers']}
     
     subject = headers.get('subject', '(No Subject)')
     sender = headers.get('from', '(No Sender)')
     date = headers.get('date', '(No Date)')
     
     # Extract body
-    body_html, body_text = extract_body_content(message['payload'])
+    body_html, body_text = extract_body_content(payload)
     
     # Prefer plain text if available, otherwise extract text from HTML
+    # (which already comes back with its whitespace collapsed)
     if body_text:
-        body = body_text
+        body = collapse_whitespace(body_text)
     else:
         body = extract_text_from_html(body_html)
     
-    # Clean up whitespace
-    body = re.sub(r'\s+', ' ', body).strip()
-    
-    return {
-        'id': message['id'],
-        'subject': subject,
-        'sender': sender,
-        'date': date,
-        'body': body,
-        'labels': message.get('labelIds', []),
-        'snippet': message.get('snippet', '')
-    }
+    # Keep only the part of the body that is analyzed
+    if body_preview_length is not None:
+        body = body[:body_preview_length]
+    
+    return Email(
+        id=message['id'],
+        subject=subject,
+        sender=sender,
+        date=date,
+        body=body,
+        labels=message.get('labelIds', []),
+        snippet=message.get('snippet', ''),
+        headers=headers
+    )
 
-def extract_body_content(payload, body_html="", body_text=""):
+def extract_body_content(payload):
     """
-    Recursively extract HTML and text body content from email payload.
+    Extract HTML and text body content from email payload.
+    
+    Parts are visited depth-first in document order with an explicit stack,
+    so deeply nested messages need no recursion.
     
     Args:
         payload (dict): Gmail API message payload
-        body_html (str): Accumulated HTML content
-        body_text (str): Accumulated text content
         
     Returns:
         tuple: (html_content, text_content)
     """
-    # If this part has content
-    if 'body' in payload and 'data' in payload['body']:
-        content = decode_payload(payload['body']['data'])
-        mime_type = payload.get('mimeType', '')
+    html_parts = []
+    text_parts = []
+    stack = [payload]
+    while stack:
+        part = stack.pop()
         
-        if 'text/html' in mime_type:
-            body_html += content
-        elif 'text/plain' in mime_type:
-            body_text += content
-    
-    # If this part has subparts, process them recursively
-    if 'parts' in payload:
-        for part in payload['parts']:
-            html, text = extract_body_content(part, body_html, body_text)
-            body_html += html
-            body_text += text
-    
-    return body_html, body_text
+        # If this part has content
+        body = part.get('body')
+        if body and 'data' in body:
+            mime_type = part.get('mimeType', '')
+            
+            if mime_type.startswith('text/html'):
+                html_parts.append(decode_payload(body['data']))
+            elif mime_type.startswith('text/plain'):
+                text_parts.append(decode_payload(body['data']))
+        
+        # Push subparts in reverse so the first one is visited next
+        if 'parts' in part:
+            stack.extend(reversed(part['parts']))
+    
+    return ''.join(html_parts), ''.join(text_parts)
 
 def decode_payload(data):
     """
@@ -93,21 +150,32 @@ def decode_payload(data):
     try:
         body_bytes = base64.urlsafe_b64decode(data)
         
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'ascii']
-        for encoding in encodings:
-            try:
-                return body_bytes.decode(encoding)
-            except UnicodeDecodeError:
-                continue
-        
-        # Fallback to ignoring errors
-        return body_bytes.decode('utf-8', errors='replace')
+        # Most bodies are UTF-8; latin-1 decodes any byte sequence, so it
+        # is the only fallback needed
+        try:
+            return body_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            return body_bytes.decode('latin-1')
         
     except Exception as e:
         logger.error(f"Error decoding payload: {str(e)}")
         return ""
 
+def collapse_whitespace(text):
+    """
+    Replace each run of whitespace with a single space and strip both ends.
+    
+    Same result as re.sub(r'\s+', ' ', text).strip(), but str.split()
+    runs in C without the regex engine and is several times faster.
+    
+    Args:
+        text (str): Text to clean up
+    
+    Returns:
+        str: Text with collapsed whitespace
+    """
+    return ' '.join(text.split())
+
 def extract_text_from_html(html_content):
     """
     Extract readable text from HTML content.
@@ -121,24 +189,13 @@ def extract_text_from_html(html_content):
     if not html_content:
         return ""
         
-    # Remove scripts, styles, and head sections
-    html_content = re.sub(r'<script.*?</script>', ' ', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<style.*?</style>', ' ', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<head.*?</head>', ' ', html_content, flags=re.DOTALL)
-    
-    # Replace break tags with newlines
-    html_content = re.sub(r'<br\s*/?>|<\/p>', '\n', html_content)
-    
-    # Remove all other HTML tags
-    html_content = re.sub(r'<[^>]+>', ' ', html_content)
+    # Remove scripts, styles, head sections and all other tags in one pass.
+    # This is as fast as building an lxml tree, even for large bodies, and
+    # needs no extra dependency.
+    html_content = _RE_HTML.sub(' ', html_content)
     
     # Unescape HTML entities
     html_content = unescape(html_content)
     
-    # Replace multiple spaces with a single space
-    html_content = re.sub(r'\s+', ' ', html_content)
-    
-    # Replace multiple newlines with a single newline
-    html_content = re.sub(r'\n+', '\n', html_content)
-    
-    return html_content.strip()
\ No newline at end of file
+    # Collapse all whitespace, including line breaks, to single spaces
+    return collapse_whitespace(html_content)
\ No newline at end of file
@@ -4,9 +4,9 @@ Handles file operations for the application.
 """
 
 import os
-import json
 import time
 from loguru import logger
+from utils import json_utils
 
 def ensure_directory_exists(directory):
     """
@@ -22,22 +22,24 @@ def ensure_directory_exists(directory):
         return True
         
     try:
-        if not os.path.exists(directory):
-            logger.debug(f"Creating directory: {directory}")
-            os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
         return True
-    except Exception as e:
+    except OSError as e:
         logger.error(f"Error creating directory {directory}: {str(e)}")
         return False
 
-def save_results(emails_processed, unnecessary_emails, results_dir=None):
+def save_results(emails_processed, unnecessary_emails, results_dir=None, pretty=False):
     """
     Save processing results to a JSON file.
     
+    The results are encoded once and written with a single call, also when
+    falling back to the current directory.
+    
     Args:
         emails_processed (list): List of all processed emails
         unnecessary_emails (list): List of emails marked as unnecessary
         results_dir (str, optional): Directory to save results
+        pretty (bool): Indent the JSON for reading; compact otherwise
         
     Returns:
         str: Path to the saved file
@@ -48,6 +50,7 @@ def save_results(emails_processed, unnecessary_emails, results_dir=None):
         'unnecessary_count': len(unnecessary_emails),
         'unnecessary_emails': unnecessary_emails
     }
+    data = json_utils.dumps(results, pretty=pretty)
     
     # Create timestamp for filename
     timestamp = time.strftime('%Y%m%d_%H%M%S')
@@ -61,8 +64,8 @@ def save_results(emails_processed, unnecessary_emails, results_dir=None):
         file_path = filename
     
     try:
-        with open(file_path, 'w') as f:
-            json.dump(results, f, indent=2)
+        with open(file_path, 'wb') as f:
+            f.write(data)
         logger.info(f"Results saved to {file_path}")
         return file_path
     except Exception as e:
@@ -70,8 +73,8 @@ def save_results(emails_processed, unnecessary_emails, results_dir=None):
         # Fallback to current directory
         fallback_path = filename
         try:
-            with open(fallback_path, 'w') as f:
-                json.dump(results, f, indent=2)
+            with open(fallback_path, 'wb') as f:
+                f.write(data)
             logger.info(f"Results saved to fallback path: {fallback_path}")
             return fallback_path
         except Exception as inner_e:
@@ -0,0 +1,45 @@
+"""
+JSON utilities module.
+Encodes and decodes JSON with orjson when it is installed.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj, pretty=False):
+    """
+    Encode an object as UTF-8 JSON bytes.
+    
+    Args:
+        obj: Object to encode
+        pretty (bool): Indent the output by two spaces instead of making it compact
+    
+    Returns:
+        bytes: Encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def loads(data):
+    """
+    Decode JSON from bytes or a string.
+    
+    Args:
+        data (bytes or str): Encoded JSON
+    
+    Returns:
+        Decoded object
+    
+    Raises:
+        ValueError: If data is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
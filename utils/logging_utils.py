@@ -18,10 +18,11 @@ def setup_logging(log_level="INFO", log_file=None):
     # Remove default logger
     logger.remove()
     
-    # Add console logger
+    # Add console logger; enqueue=True hands the writes to a background thread
     logger.add(
         sys.stderr,
         level=log_level,
+        enqueue=True,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
     )
     
@@ -29,15 +30,17 @@ def setup_logging(log_level="INFO", log_file=None):
     if log_file:
         # Ensure directory exists
         log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
             
         logger.add(
             log_file,
             level=log_level,
+            enqueue=True,
             format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
             rotation="10 MB",
-            retention="1 week"
+            retention="1 week",
+            compression="gz"
         )
     
     logger.info(f"Logging initialized at {log_level} level")
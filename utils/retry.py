@@ -0,0 +1,90 @@
+"""
+Retry utilities module.
+Retries failing API calls with exponential backoff and jitter.
+"""
+
+import functools
+import random
+import time
+from loguru import logger
+
+# HTTP status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Error reasons with which Gmail reports rate limiting as a 403
+_RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+def _is_rate_limited(error):
+    """
+    Check whether a 403 error reports rate limiting rather than a permission problem.
+    
+    Args:
+        error (Exception): HttpError-like error with error_details
+    
+    Returns:
+        bool: True if one of the error's reasons is a rate limit reason
+    """
+    details = getattr(error, 'error_details', None)
+    if isinstance(details, list):
+        return any(
+            isinstance(detail, dict) and detail.get('reason') in _RATE_LIMIT_REASONS
+            for detail in details
+        )
+    return any(reason in str(details) for reason in _RATE_LIMIT_REASONS)
+
+def _is_retryable(error):
+    """
+    Check whether an error is transient and the call should be retried.
+    
+    Args:
+        error (Exception): Error raised by the wrapped call
+    
+    Returns:
+        bool: True if the call should be retried
+    """
+    resp = getattr(error, 'resp', None)
+    if resp is None:
+        return True
+    if resp.status == 403:
+        return _is_rate_limited(error)
+    return resp.status in RETRYABLE_STATUSES
+
+def retry(exc, attempts=3, base=2, cap=30):
+    """
+    Decorator retrying a function when it raises exc.
+    
+    The delay before retry n is min(cap, base * 2**n) plus up to base seconds
+    of random jitter. Errors carrying an HTTP response (e.g. HttpError) are
+    only retried for rate limiting (including Gmail's rate limit 403s) and
+    server errors. Callers can override attempts and base per call with the
+    retry_attempts and retry_delay keyword arguments.
+    
+    Args:
+        exc (type or tuple): Exception type(s) to retry on
+        attempts (int): Default number of attempts
+        base (int): Default base delay in seconds
+        cap (int): Maximum backoff delay in seconds, before jitter
+    
+    Returns:
+        callable: Decorator for the function to retry
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, retry_attempts=None, retry_delay=None, **kwargs):
+            max_attempts = max(1, attempts if retry_attempts is None else retry_attempts)
+            delay = base if retry_delay is None else retry_delay
+            
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except exc as error:
+                    if attempt < max_attempts - 1 and _is_retryable(error):
+                        wait = min(cap, delay * 2 ** attempt) + random.uniform(0, delay)
+                        logger.warning(f"Error in {func.__name__} (attempt {attempt+1}/{max_attempts}), retrying in {wait:.1f}s: {error}")
+                        time.sleep(wait)
+                    else:
+                        logger.error(f"{func.__name__} failed after {attempt+1} attempts: {error}")
+                        raise
+        
+        return wrapper
+    return decorator